@@ -4,15 +4,32 @@ import time
 
 init(autoreset=True)
 
+# (prefix, suffix) per colour, built once instead of on every log() call
+_COLORS = {
+    name: (code, Style.RESET_ALL)
+    for name, code in {"green": Fore.GREEN, "magenta": Fore.MAGENTA, "red": Fore.RED, "cyan": Fore.CYAN}.items()
+}
+_PLAIN = ("", Style.RESET_ALL)
+
+# log() bursts many lines per second; only reformat when the second changes
+_last_sec = -1
+_last_ts = ""
+
 def log(msg, color=None):
-    ts = time.strftime("%H:%M:%S")
-    c = {"green": Fore.GREEN, "magenta": Fore.MAGENTA, "red": Fore.RED, "cyan": Fore.CYAN}.get(color, "")
-    print(f"[{ts}] {c}{msg}{Style.RESET_ALL}")
+    global _last_sec, _last_ts
+    now = int(time.time())
+    if now != _last_sec:
+        _last_sec = now
+        _last_ts = time.strftime("%H:%M:%S", time.localtime(now))
+    ts = _last_ts
+    pre, post = _COLORS.get(color, _PLAIN)
+    print(f"[{ts}] {pre}{msg}{post}")
 
 def divider(ch="="):
     print(ch * 60)
 
 def show_summary(data):
     log("🧠 Summary", "magenta")
-    for k, v in data.items():
-        print(f" • {k}: {v}")
+    # one write for the whole block instead of one print per line
+    if data:
+        print("\n".join(f" • {k}: {v}" for k, v in data.items()))
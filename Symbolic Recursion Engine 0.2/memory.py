@@ -1,72 +1,163 @@
 # memory.py
+import heapq
 import json
 import os
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, deque
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from itertools import chain
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    import orjson  # optional, much faster (de)serialization
+except ImportError:
+    orjson = None
+
+def _dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+def _loads(s: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
 
 @dataclass
 class MemEvent:
+    # no per-instance __dict__: cheaper to create, and up to max_events stay resident
+    __slots__ = ("ts", "kind", "text", "meta")
+
     ts: float
     kind: str
     text: str
     meta: dict
 
+    def as_dict(self) -> dict:
+        return {"ts": self.ts, "kind": self.kind, "text": self.text, "meta": self.meta}
+
 class Memory:
     """
     Disk-friendly, crash-proof memory store.
     - events: JSONL
-    - graph: JSON (plain dict-of-dicts)
+    - graph: JSON (plain dict-of-dicts) snapshot + JSONL journal of link deltas
     """
-    def __init__(self, events_path: str, graph_path: str, max_events: int = 5000):
+    def __init__(self, events_path: str, graph_path: str, max_events: int = 5000,
+                 journal_max: int = 2000, flush_every: int = 32):
         self.events_path = events_path
         self.graph_path = graph_path
+        self.journal_path = graph_path + ".journal"
         self.max_events = max_events
+        self.journal_max = max(1, int(journal_max))  # full graph dump past N journal lines
+        self.flush_every = max(1, int(flush_every))  # write events out every N appends
 
-        self.events: List[MemEvent] = []
+        self.events: Deque[MemEvent] = deque(maxlen=max_events)  # oldest evicted on append
         self.graph = defaultdict(Counter)  # graph[a][b] = weight
+        self.symbol_counts: Counter = Counter()  # symbol -> occurrences in self.events
+
+        # events.jsonl is append-only between compactions: save() writes only
+        # what is new through a handle kept open for the Memory's lifetime
+        self._events_fh = None
+        self._unsaved: List[MemEvent] = []
+        self._disk_events = 0  # lines currently in events_path
+
+        # links made since the last save; written to the journal, folded into
+        # graph.json once the journal passes `journal_max` lines or on close()
+        self._journal_fh = None
+        self._unjournaled: List[Tuple[str, str, int]] = []
+        self._journal_lines = 0  # deltas in journal_path, counting ones replayed on load
+
+        # graph.json carries a "__gen__" number and the journal starts with a
+        # {"gen": n} header; a journal is only replayed onto the snapshot of the
+        # same generation, so one left over from before the last snapshot
+        # (crash between os.replace and the journal reset) is ignored
+        self._graph_gen = 0
+        self._journal_stale = False  # on-disk journal belongs to another generation
+
+        # top _top_syms_k ranked symbols, rebuilt lazily after append() invalidates them
+        self._top_syms_cache: Optional[List[Tuple[str, int]]] = None
+        self._top_syms_k = 0
+
+        # pair weight by canonical (a, b), a < b, plus a max-heap of
+        # (-weight, pair) entries; entries whose weight no longer matches
+        # _pair_weights are stale and skipped by top_pairs()
+        self._pair_weights: Dict[Tuple[str, str], int] = {}
+        self._pair_heap: List[Tuple[int, Tuple[str, str]]] = []
 
         self._ensure_parent(self.events_path)
         self._ensure_parent(self.graph_path)
 
         self._load_events()
         self._load_graph()
+        self._index_pairs()
+        self._replay_journal()
 
     def _ensure_parent(self, path: str) -> None:
         d = os.path.dirname(path)
         if d:
             os.makedirs(d, exist_ok=True)
 
+    def _tail_lines(self, path: str, n: int) -> Tuple[List[bytes], int]:
+        """
+        Last n non-empty lines of a file, read backwards in 64 KiB blocks so
+        only the tail we keep is ever loaded. Also returns how many lines were
+        seen, which is n + 1 (a lower bound) when the file holds more.
+        """
+        found: List[bytes] = []  # newest first
+        with open(path, "rb") as f:
+            pos = f.seek(0, os.SEEK_END)
+            carry = b""
+            while pos > 0 and len(found) <= n:
+                step = min(1 << 16, pos)
+                pos -= step
+                f.seek(pos)
+                parts = (f.read(step) + carry).split(b"\n")
+                carry = parts[0]  # may continue in the previous block
+                found.extend(p for p in reversed(parts[1:]) if p.strip())
+            if pos == 0 and carry.strip():
+                found.append(carry)
+        seen = len(found)
+        found = found[:n]
+        found.reverse()
+        return found, seen
+
     def _load_events(self) -> None:
         if not os.path.exists(self.events_path):
             return
         try:
-            with open(self.events_path, "r", encoding="utf-8", errors="ignore") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    obj = json.loads(line)
-                    self.events.append(MemEvent(**obj))
-        except Exception:
-            # if file is corrupt, don't die — just start fresh in memory
-            self.events = []
+            # keep bounded: only the last max_events lines are parsed
+            lines, self._disk_events = self._tail_lines(self.events_path, self.max_events)
+        except OSError:
+            # if file is unreadable, don't die — just start fresh in memory
+            # (the next flush() rewrites it)
+            self._disk_events = 2 * self.max_events
+            lines = []
+        for line in lines:
+            try:
+                obj = _loads(line.decode("utf-8", errors="ignore"))
+                self.events.append(MemEvent(**obj))
+            except Exception:
+                # torn last line after a crash, etc. — skip just that line
+                continue
 
         # rebuild symbol nodes from events (graph edges are in graph.json)
-        # keep bounded
-        if len(self.events) > self.max_events:
-            self.events = self.events[-self.max_events:]
+        self.symbol_counts.update(chain.from_iterable(ev.meta.get("symbols", []) for ev in self.events))
 
     def _load_graph(self) -> None:
         if not os.path.exists(self.graph_path):
             return
         try:
             with open(self.graph_path, "r", encoding="utf-8", errors="ignore") as f:
-                obj = json.load(f) or {}
-            # obj is dict[str, dict[str, int]]
+                obj = _loads(f.read()) or {}
+            # obj is dict[str, dict[str, int]] plus the "__gen__" tag
+            gen = obj.pop("__gen__", 0)
+            self._graph_gen = gen if type(gen) is int else 0
             for a, nbrs in obj.items():
                 if not isinstance(nbrs, dict):
                     continue
+                # our own snapshots are all ints: take the row in one C-level copy
+                if all(type(w) is int for w in nbrs.values()):
+                    self.graph[a] = Counter(nbrs)
+                    continue
                 for b, w in nbrs.items():
                     try:
                         self.graph[a][b] = int(w)
@@ -76,14 +167,64 @@ class Memory:
             # don't die
             self.graph = defaultdict(Counter)
 
+    def _index_pairs(self) -> None:
+        self._pair_weights = {
+            (a, b): int(w) for a, nbrs in self.graph.items() for b, w in nbrs.items() if a < b
+        }
+        self._pair_heap = [(-w, p) for p, w in self._pair_weights.items()]
+        heapq.heapify(self._pair_heap)
+
+    def _replay_journal(self) -> None:
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8", errors="ignore") as f:
+            first = f.readline()
+            try:
+                head = _loads(first)
+            except Exception:
+                head = None
+            if isinstance(head, dict) and "gen" in head:
+                gen = head["gen"]
+            else:
+                gen = 0  # journal without a header: pairs with an untagged snapshot
+                f.seek(0)
+            if gen != self._graph_gen:
+                # already folded into graph.json; start a fresh journal on next save
+                self._journal_stale = True
+                return
+            for line in f:
+                try:
+                    d = _loads(line)
+                    self._bump(d["a"], d["b"], int(d["dw"]))
+                    self._journal_lines += 1
+                except Exception:
+                    # torn last line after a crash, etc.
+                    continue
+
     def append(self, ev: MemEvent) -> None:
+        if self.events and len(self.events) == self.events.maxlen:
+            self._forget_symbols(self.events[0])  # about to be evicted
         self.events.append(ev)
-        if len(self.events) > self.max_events:
-            self.events = self.events[-self.max_events:]
+        self._unsaved.append(ev)
+        self._top_syms_cache = None
 
         # ensure nodes exist
         for s in ev.meta.get("symbols", []):
             _ = self.graph[s]
+        self.symbol_counts.update(ev.meta.get("symbols", []))
+
+        # disk I/O last: if it raises, in-memory state is already consistent
+        if len(self._unsaved) >= self.flush_every:
+            self.flush()
+
+    def _forget_symbols(self, ev: MemEvent) -> None:
+        counts = self.symbol_counts
+        for s in ev.meta.get("symbols", []):
+            c = counts[s] - 1
+            if c > 0:
+                counts[s] = c
+            else:
+                del counts[s]
 
     def link(self, a: str, b: str, w: int = 1) -> None:
         if not a or not b:
@@ -96,36 +237,150 @@ class Memory:
             w = 1
         if w <= 0:
             w = 1
+        self._bump(a, b, w)
+        self._unjournaled.append((a, b, w))
+
+    def _bump(self, a: str, b: str, w: int) -> None:
         self.graph[a][b] += w
         self.graph[b][a] += w
 
+        key = (a, b) if a < b else (b, a)
+        pw = self.graph[key[0]][key[1]]
+        self._pair_weights[key] = pw
+        heapq.heappush(self._pair_heap, (-pw, key))
+        # every bump leaves a stale entry behind; rebuild before they pile up
+        if len(self._pair_heap) > 2 * len(self._pair_weights) + 64:
+            self._pair_heap = [(-w, p) for p, w in self._pair_weights.items()]
+            heapq.heapify(self._pair_heap)
+
     def top_symbols(self, n: int) -> List[Tuple[str, int]]:
-        counts = Counter()
-        for ev in self.events:
-            for s in ev.meta.get("symbols", []):
-                counts[s] += 1
-        return counts.most_common(n)
+        # counts cover exactly the current event window, but equal counts
+        # rank by first insertion into symbol_counts (this session), not by
+        # first appearance in the window
+        if self._top_syms_cache is None or n > self._top_syms_k:
+            # partial ranking (heapq.nlargest inside most_common) with headroom
+            # so pick_symbol/observer/summary requests are all served by one build
+            self._top_syms_k = max(n, 64)
+            self._top_syms_cache = self.symbol_counts.most_common(self._top_syms_k)
+        return self._top_syms_cache[:n]
 
     def top_pairs(self, n: int) -> List[Tuple[Tuple[str, str], int]]:
-        pairs = Counter()
-        for a, nbrs in self.graph.items():
-            for b, w in nbrs.items():
-                if a < b:
-                    pairs[(a, b)] += int(w)
-        return pairs.most_common(n)
-
-    def _graph_as_plain_dict(self) -> Dict[str, Dict[str, int]]:
-        out: Dict[str, Dict[str, int]] = {}
-        for a, nbrs in self.graph.items():
-            out[a] = {b: int(w) for b, w in nbrs.items()}
+        heap = self._pair_heap
+        weights = self._pair_weights
+        out: List[Tuple[Tuple[str, str], int]] = []
+        while heap and len(out) < n:
+            negw, pair = heapq.heappop(heap)
+            if weights.get(pair) == -negw:
+                out.append((pair, -negw))
+        # put the live entries back; stale ones popped on the way are dropped
+        for pair, w in out:
+            heapq.heappush(heap, (-w, pair))
         return out
 
+    def _events_file(self):
+        if self._events_fh is None:
+            self._events_fh = open(self.events_path, "a", buffering=1 << 16, encoding="utf-8")
+            if self._events_fh.tell() > 0:
+                with open(self.events_path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+                if torn:
+                    # end a torn last line so the next event starts on its own
+                    self._events_fh.write("\n")
+        return self._events_fh
+
+    def flush(self) -> None:
+        # compact once the file holds about twice what we keep in memory,
+        # otherwise just append the events added since the last flush
+        if self._disk_events + len(self._unsaved) > 2 * self.max_events:
+            # rewrite to a temp file and swap it in, so a crash mid-compaction
+            # leaves the old log intact
+            if self._events_fh is not None:
+                self._events_fh.close()
+                self._events_fh = None
+            tmp = self.events_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in self.events:
+                    f.write(_dumps(e.as_dict()) + "\n")
+            os.replace(tmp, self.events_path)
+            self._disk_events = len(self.events)
+            self._events_file()
+        elif self._unsaved:
+            f = self._events_file()
+            for e in self._unsaved:
+                f.write(_dumps(e.as_dict()) + "\n")
+            f.flush()
+            self._disk_events += len(self._unsaved)
+        self._unsaved.clear()
+
+    def _journal_file(self):
+        if self._journal_fh is None:
+            mode = "w" if self._journal_stale else "a"
+            self._journal_fh = open(self.journal_path, mode, buffering=1 << 16, encoding="utf-8")
+            self._journal_stale = False
+            if self._journal_fh.tell() == 0:
+                self._journal_fh.write(_dumps({"gen": self._graph_gen}) + "\n")
+        return self._journal_fh
+
+    def _write_graph_snapshot(self) -> None:
+        # stream one node per line straight from the Counters (weights are
+        # always ints) instead of copying into a plain dict first
+        gen = self._graph_gen + 1
+        tmp = self.graph_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("{\n")
+            f.write(_dumps("__gen__"))
+            f.write(": ")
+            f.write(str(gen))
+            sep = ",\n"
+            for a, nbrs in self.graph.items():
+                f.write(sep)
+                f.write(_dumps(a))
+                f.write(": ")
+                f.write(_dumps(nbrs))
+                sep = ",\n"
+            f.write("\n}\n")
+        os.replace(tmp, self.graph_path)
+        self._graph_gen = gen
+
+        # snapshot now holds every delta, start a fresh journal for this
+        # generation (until that happens the old one no longer matches)
+        if self._journal_fh is not None:
+            self._journal_fh.close()
+            self._journal_fh = None
+        self._journal_stale = True
+        self._journal_file().flush()
+        self._journal_lines = 0
+
+    def _save_graph(self) -> None:
+        # decide on what is actually in the journal (including earlier
+        # sessions), not on how often this process has saved
+        pending = self._journal_lines + len(self._unjournaled)
+        if pending > self.journal_max or not os.path.exists(self.graph_path):
+            self._write_graph_snapshot()
+        elif self._unjournaled:
+            f = self._journal_file()
+            for a, b, w in self._unjournaled:
+                f.write(_dumps({"a": a, "b": b, "dw": w}) + "\n")
+            f.flush()
+            self._journal_lines += len(self._unjournaled)
+        self._unjournaled.clear()
+
+    def close(self) -> None:
+        # a clean exit always leaves graph.json current and the journal empty
+        if self._unjournaled or self._journal_lines:
+            self._write_graph_snapshot()
+            self._unjournaled.clear()
+        if self._events_fh is not None:
+            self._events_fh.close()
+            self._events_fh = None
+        if self._journal_fh is not None:
+            self._journal_fh.close()
+            self._journal_fh = None
+
     def save(self) -> None:
-        # events -> JSONL
-        with open(self.events_path, "w", encoding="utf-8") as f:
-            for e in self.events:
-                f.write(json.dumps(e.__dict__, ensure_ascii=False) + "\n")
-
-        # graph -> JSON (must be plain dict)
-        with open(self.graph_path, "w", encoding="utf-8") as f:
-            json.dump(self._graph_as_plain_dict(), f, indent=2, ensure_ascii=False)
+        # events -> JSONL (append-only, compacted when it grows too large)
+        self.flush()
+
+        # graph -> journal of new links, full JSON snapshot once it grows
+        self._save_graph()
@@ -12,7 +12,9 @@ import sys
 import time
 import random
 import re
-from collections import deque
+from collections import Counter, deque
+from functools import lru_cache
+from itertools import accumulate
 from typing import List, Optional, Tuple, Set, Dict, Any
 
 from memory import Memory, MemEvent
@@ -54,8 +56,18 @@ CFG: Dict[str, Any] = {
     "max_symbol_len": 32,
 }
 
-BRACKET_RE = re.compile(r"\[([^\[\]]+)\]")
 TOKEN_RE = re.compile(r"[A-Za-z0-9_\-]{1,64}")
+# one pass yielding (bracket_body, "") or ("", token) per match
+SYMBOL_RE = re.compile(r"\[([^\[\]]+)\]|([A-Za-z0-9_\-]{1,64})")
+NORM_RE = re.compile(r"[^a-z0-9_\-\(\):]")
+
+# ASCII fast path for norm(): lowercase, space -> "_" and the NORM_RE
+# deletion in a single str.translate pass
+_SYMBOL_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789_-():"
+NORM_TABLE = {
+    ord(c): ("_" if c == " " else c.lower() if c.lower() in _SYMBOL_CHARS else None)
+    for c in map(chr, range(128))
+}
 
 # ================= HELPERS =================
 
@@ -64,12 +76,20 @@ def ensure_parent(path: str) -> None:
     if d:
         os.makedirs(d, exist_ok=True)
 
+# the same few hundred symbols are normalized over and over; note the cache
+# means a runtime change to CFG["max_symbol_len"] needs norm.cache_clear()
+@lru_cache(maxsize=4096)
 def norm(s: str) -> str:
-    s = (s or "").strip().lower().replace(" ", "_")
-    s = re.sub(r"[^a-z0-9_\-\(\):]", "", s)
+    s = (s or "").strip()
+    if s.isascii():
+        s = s.translate(NORM_TABLE)
+    else:
+        s = NORM_RE.sub("", s.lower().replace(" ", "_"))
     if not s:
         return "void"
-    return s[:CFG["max_symbol_len"]]
+    # interned: symbol keys in memory/graph dicts share one object, so
+    # lookups hit the cached hash and compare by identity
+    return sys.intern(s[:CFG["max_symbol_len"]])
 
 def bracket(s: str) -> str:
     return f"[{s}]"
@@ -85,29 +105,43 @@ def canon_pair(a: str, b: str) -> Tuple[str, str]:
 
 def extract_symbols(text: str) -> List[str]:
     out: List[str] = []
-
-    for b in BRACKET_RE.findall(text):
-        s = norm(b)
+    add = out.append
+    _norm = norm
+
+    brackets: List[str] = []
+    tokens: List[str] = []
+    for b, t in SYMBOL_RE.findall(text):
+        if b:
+            brackets.append(b)
+        else:
+            tokens.append(t)
+
+    for b in brackets:
+        s = _norm(b)
         if s and not s.isdigit():
-            out.append(s)
+            add(s)
 
     if out:
         return out
+    if brackets:
+        # every bracket was numeric; fall back to all tokens, inside brackets too
+        tokens = TOKEN_RE.findall(text)
 
-    for t in TOKEN_RE.findall(text):
+    for t in tokens:
         if t.isdigit():
             continue
-        s = norm(t)
+        s = _norm(t)
         if s and not s.isdigit():
-            out.append(s)
+            add(s)
 
     return out
 
 def load_seed(seed_path: str) -> List[str]:
     try:
         with open(seed_path, "r", encoding="utf-8", errors="ignore") as f:
-            items = [line.strip() for line in f if line.strip()]
-        items = [norm(x) for x in items]
+            # one read + split instead of Python-level line iteration
+            lines = f.read().split("\n")
+        items = [norm(x) for x in map(str.strip, lines) if x]
         return [x for x in items if x and not x.isdigit()]
     except Exception:
         return []
@@ -139,27 +173,65 @@ class Mirror0:
         self.observer = Observer("Mirror-1")
 
         self.recent = deque(maxlen=CFG["repeat_window"])
+        self.recent_counts: Counter = Counter()  # mirrors self.recent for O(1) "in"
         self.abstracted_pairs: Set[Tuple[str, str]] = set()
         self.abs_rate_window = deque(maxlen=100)  # 1 if abstract happened else 0
-
-    def pick_symbol(self) -> str:
+        self.abs_rate_sum = 0  # running sum(self.abs_rate_window)
+
+    def remember(self, s: str) -> None:
+        recent = self.recent
+        if not recent.maxlen:
+            return  # repeat_window 0: nothing is ever "recent"
+        counts = self.recent_counts
+        if recent and len(recent) == recent.maxlen:
+            old = recent[0]  # about to be evicted
+            c = counts[old] - 1
+            if c > 0:
+                counts[old] = c
+            else:
+                del counts[old]
+        recent.append(s)
+        counts[s] += 1
+
+    def note_abstraction(self, hit: int) -> None:
+        window = self.abs_rate_window
+        if len(window) == window.maxlen:
+            self.abs_rate_sum -= window[0]  # about to be evicted
+        window.append(hit)
+        self.abs_rate_sum += hit
+
+    def split_tops(self) -> Tuple[List[str], List[str], List[int]]:
         tops = self.memory.top_symbols(20)
         abstractions = [s for s, _ in tops if is_abs(s) and abs_depth(s) <= CFG["max_abs_depth"]]
         primitives = [s for s, _ in tops if not is_abs(s)]
+        # cumulative weights: random.choices then only bisects per draw
+        cum_weights = list(accumulate(c for s, c in tops if not is_abs(s)))
+        return abstractions, primitives, cum_weights
+
+    def pick_symbol(self, abstractions: Optional[List[str]] = None,
+                    primitives: Optional[List[str]] = None,
+                    cum_weights: Optional[List[int]] = None) -> str:
+        if abstractions is None or primitives is None:
+            abstractions, primitives, cum_weights = self.split_tops()
+        recent = self.recent_counts
 
         # inject seed sometimes to avoid lock-in
         if self.seed_cache and random.random() < CFG["explore_chance"]:
-            cands = [s for s in self.seed_cache if s not in self.recent]
+            cands = [s for s in self.seed_cache if s not in recent]
             return random.choice(cands) if cands else random.choice(self.seed_cache)
 
         # sometimes pick an abstraction
         if abstractions and random.random() < CFG["abs_pick_chance"]:
-            cands = [a for a in abstractions if a not in self.recent]
+            cands = [a for a in abstractions if a not in recent]
             return random.choice(cands) if cands else random.choice(abstractions)
 
-        # otherwise pick a primitive, avoid recent
+        # otherwise pick a primitive, weighted by frequency, avoid recent
         if primitives:
-            cands = [p for p in primitives if p not in self.recent]
+            for _ in range(3):
+                s = random.choices(primitives, cum_weights=cum_weights)[0]
+                if s not in recent:
+                    return s
+            cands = [p for p in primitives if p not in recent]
             return random.choice(cands) if cands else random.choice(primitives)
 
         # fallback
@@ -173,16 +245,20 @@ class Mirror0:
 
     def try_abstract(self) -> Optional[str]:
         # rate limit
-        if sum(self.abs_rate_window) >= CFG["max_abs_per_100_cycles"]:
+        if self.abs_rate_sum >= CFG["max_abs_per_100_cycles"]:
             return None
 
+        min_support = CFG["min_pair_support"]
+        max_depth = CFG["max_abs_depth"]
+
         for (a, b), w in self.top_pairs(80):
-            a = norm(a)
-            b = norm(b)
             w = int(w)
+            # pairs come heaviest first: nothing after this one has support
+            if w < min_support:
+                break
 
-            if w < CFG["min_pair_support"]:
-                continue
+            a = norm(a)
+            b = norm(b)
             if a == b:
                 continue
             if is_abs(a) or is_abs(b):
@@ -192,8 +268,9 @@ class Mirror0:
             if key in self.abstracted_pairs:
                 continue
 
-            abs_sym = norm(f"abs({a}_{b})")
-            if abs_depth(abs_sym) > CFG["max_abs_depth"]:
+            # a and b are normalized, so only the length cap of norm() applies
+            abs_sym = sys.intern(f"abs({a}_{b})"[:CFG["max_symbol_len"]])
+            if abs_depth(abs_sym) > max_depth:
                 continue
 
             # link abstraction node strongly enough to be “seen”
@@ -201,11 +278,11 @@ class Mirror0:
             self.memory.link(abs_sym, b, max(2, w // 2))
 
             self.abstracted_pairs.add(key)
-            self.abs_rate_window.append(1)
+            self.note_abstraction(1)
 
             return f"Δ abstract {bracket(abs_sym)} := {bracket(a)} ⊗ {bracket(b)} (support:{w})"
 
-        self.abs_rate_window.append(0)
+        self.note_abstraction(0)
         return None
 
     def cycle(self, n: int) -> None:
@@ -214,42 +291,63 @@ class Mirror0:
 
         used: List[str] = []
 
+        # rank/split the top symbols once per cycle, not once per thought
+        abstractions, primitives, cum_weights = self.split_tops()
+
+        # hoisted lookups for the thought loop
+        memory = self.memory
+        append, link = memory.append, memory.link
+        context, allow = self.observer.context, self.observer.allow
+        pick, remember = self.pick_symbol, self.remember
+        now = time.time
+        delay = CFG["recursion_delay"]
+        clock = time.monotonic
+
+        # pace thoughts against a fixed schedule: time spent thinking counts
+        # towards the delay, and only the remainder is slept
+        deadline = clock()
+
         for _ in range(thoughts):
-            s = self.pick_symbol()
-            ctx = norm(str(self.observer.context(self.memory)))
+            # picks come from normalized seeds/memory; normalize once, reuse below
+            s = norm(pick(abstractions, primitives, cum_weights))
+            ctx = norm(str(context(memory)))
 
             # text format stays simple and parseable
             text = f"{bracket(s)} :: {ctx}"
 
             # track BOTH s and ctx as symbols so the graph has edges to learn
-            syms = [norm(s)]
+            syms = [s]
             if ctx and ctx != "void" and not ctx.isdigit():
                 syms.append(ctx)
 
             ev = MemEvent(
-                ts=time.time(),
+                ts=now(),
                 kind="reflection",
                 text=text,
                 meta={"symbols": syms},
             )
 
-            if self.observer.allow(text):
-                self.memory.append(ev)
+            if allow(text):
+                append(ev)
                 log(text)
 
                 # strengthen the relationship between s and ctx
                 if len(syms) >= 2:
-                    self.memory.link(syms[0], syms[1], 1)
+                    link(syms[0], syms[1], 1)
 
-            used.append(norm(s))
-            self.recent.append(norm(s))
+            used.append(s)
+            remember(s)
 
-            time.sleep(CFG["recursion_delay"])
+            deadline += delay
+            rem = deadline - clock()
+            if rem > 0:
+                time.sleep(rem)
 
-        # chain-link within the cycle (adds structure)
-        for i in range(len(used) - 1):
-            if used[i] != used[i + 1]:
-                self.memory.link(used[i], used[i + 1], 1)
+        # chain-link within the cycle (adds structure); repeated pairs are
+        # folded into one weighted link
+        chain = Counter(canon_pair(a, b) for a, b in zip(used, used[1:]) if a != b)
+        for (a, b), w in chain.items():
+            link(a, b, w)
 
         # abstraction attempt (paced)
         if (n % CFG["abstraction_every"] == 0) and (random.random() < CFG["insight_chance"]):
@@ -268,6 +366,9 @@ class Mirror0:
     def save(self) -> None:
         self.memory.save()
 
+    def close(self) -> None:
+        self.memory.close()
+
 # ================= MAIN =================
 
 if __name__ == "__main__":
@@ -284,3 +385,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         log("\n🛑 Interrupted — saving & exiting.", "red")
         engine.save()
+        engine.close()